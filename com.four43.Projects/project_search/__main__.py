@@ -1,7 +1,10 @@
+import json
 import logging
 import os
+import re
+import shlex
 from pathlib import Path
-from typing import Any, List, Optional
+from typing import Any, List, NamedTuple, Optional
 
 import toml
 from gi.repository import Gio, GLib
@@ -14,6 +17,56 @@ config = toml.load(DIR.parent / "meta.toml")
 
 log = logging.getLogger(__name__)
 
+# Files whose presence in a project root identifies its language, used by `language` app rules
+LANGUAGE_MARKERS = {
+    "python": ["pyproject.toml", "setup.py", "setup.cfg", "requirements.txt"],
+    "rust": ["Cargo.toml"],
+    "go": ["go.mod"],
+    "javascript": ["package.json"],
+    "typescript": ["tsconfig.json"],
+    "java": ["pom.xml", "build.gradle", "build.gradle.kts"],
+    "ruby": ["Gemfile"],
+    "php": ["composer.json"],
+    "c": ["CMakeLists.txt", "meson.build", "Makefile"],
+}
+
+
+# Desktop entry Exec field codes, see the Desktop Entry Specification
+FIELD_CODE = re.compile(r"^%[fFuUdDnNickvm]$")
+# JSON strings are matched first so comment-like text inside them is kept
+JSONC_COMMENT = re.compile(r'("(?:\\.|[^"\\])*")|//[^\n]*|/\*.*?\*/', re.DOTALL)
+JSONC_TRAILING_COMMA = re.compile(r'("(?:\\.|[^"\\])*")|,(?=\s*[}\]])')
+
+
+def load_jsonc(path: Path) -> Any:
+    """Load JSON with comments and trailing commas, as used by devcontainer.json."""
+    text = path.read_text()
+    text = JSONC_COMMENT.sub(lambda m: m.group(1) or "", text)
+    text = JSONC_TRAILING_COMMA.sub(lambda m: m.group(1) or "", text)
+    return json.loads(text)
+
+
+# Single-config dev container layouts, in the order VSCode looks for them. Named configs in
+# .devcontainer/<name>/devcontainer.json aren't supported, those need VSCode's config picker.
+DEVCONTAINER_FILES = [Path(".devcontainer") / "devcontainer.json", Path(".devcontainer.json")]
+
+
+def find_devcontainer(project_path: Path) -> Optional[Path]:
+    for devcontainer_file in DEVCONTAINER_FILES:
+        if (project_path / devcontainer_file).exists():
+            return project_path / devcontainer_file
+    return None
+
+
+class LaunchTarget(NamedTuple):
+    """Resolved app choice for a single project, cached per result_id."""
+    # Desktop app the rule selected, used for the result icon
+    desktop_info: Gio.DesktopAppInfo
+    # App info actually launched, differs from desktop_info for rules with open_in_container
+    launch_info: Gio.AppInfo
+    uris: list[str]
+
+
 class ProjectSearch(SearchProvider):
 
     icon = Gio.ThemedIcon.new("code")
@@ -24,6 +77,9 @@ class ProjectSearch(SearchProvider):
         self.project_paths = [Path(x) for x in self.user_config["project_paths"]]
         self.keep_parent = self.user_config.get("keep_parent", True)
         self.ide_desktop_files = self.user_config.get("ide_desktop_files", ["code.desktop"])
+        self.app_rules = self.user_config.get("app_rules", [])
+        self._desktop_infos: dict[str, Optional[Gio.DesktopAppInfo]] = {}
+        self._launch_targets: dict[str, LaunchTarget] = {}
         log.info(f"Project paths: {self.project_paths}")
 
     def _load_user_config(self, provider_id: str) -> dict[str, Any] | dict[str, list[Any]]:
@@ -33,7 +89,13 @@ class ProjectSearch(SearchProvider):
                 "/home/your-user-name/projects/namespace-b",
             ],
             "keep_parent": True,
-            "ide_desktop_files": ["code.desktop", "org.gnome.TextEditor.desktop"]
+            "ide_desktop_files": ["code.desktop", "org.gnome.TextEditor.desktop"],
+            # First matching rule wins, otherwise ide_desktop_files is used
+            "app_rules": [
+                {"devcontainer": True, "open_in_container": True, "desktop_files": ["code.desktop"]},
+                {"language": "python", "desktop_files": ["pycharm.desktop", "code.desktop"]},
+                {"marker": "Cargo.toml", "desktop_files": ["rustrover.desktop", "code.desktop"]},
+            ],
         }
         log.debug(f"Loading user config from: {[xdg_config_home()] + xdg_config_dirs()}")
 
@@ -76,18 +138,101 @@ class ProjectSearch(SearchProvider):
                     return str(project_path.relative_to(project_dir))
         raise RuntimeError("Cannot find path in project paths")
 
-    def _app_info(self, result_id: str) -> Gio.DesktopAppInfo:
-        # result_id is available here if you wanted to do more complex logic of choosing which app opens what
-        for desktop_name in self.ide_desktop_files:
+    def _desktop_info(self, desktop_name: str) -> Optional[Gio.DesktopAppInfo]:
+        if desktop_name not in self._desktop_infos:
             try:
-                info = Gio.DesktopAppInfo.new(desktop_name)
-                logging.debug("Loaded app info from %s", desktop_name)
-                return info
+                self._desktop_infos[desktop_name] = Gio.DesktopAppInfo.new(desktop_name)
+                log.debug("Loaded app info from %s", desktop_name)
             except TypeError as e:
                 # This happens when the constructor returns NULL because the file
                 # doesn't exist.
                 log.debug("Failed to load app info from %s", desktop_name)
-        raise FileNotFoundError(f"No app info found for any listed apps: {self.ide_desktop_files}")
+                self._desktop_infos[desktop_name] = None
+        return self._desktop_infos[desktop_name]
+
+    def _first_app_info(self, desktop_names: list[str]) -> Gio.DesktopAppInfo:
+        for desktop_name in desktop_names:
+            info = self._desktop_info(desktop_name)
+            if info is not None:
+                return info
+        raise FileNotFoundError(f"No app info found for any listed apps: {desktop_names}")
+
+    @staticmethod
+    def _rule_matches(rule: dict[str, Any], project_path: Path) -> bool:
+        if "marker" in rule and not any(project_path.glob(rule["marker"])):
+            return False
+        if "language" in rule:
+            markers = LANGUAGE_MARKERS.get(rule["language"], [])
+            if not any((project_path / marker).exists() for marker in markers):
+                return False
+        if "devcontainer" in rule:
+            has_devcontainer = find_devcontainer(project_path) is not None
+            if has_devcontainer != rule["devcontainer"]:
+                return False
+        return True
+
+    @staticmethod
+    def _devcontainer_workspace_folder(project_path: Path) -> str:
+        default_folder = f"/workspaces/{project_path.name}"
+        devcontainer_path = find_devcontainer(project_path)
+        if devcontainer_path is None:
+            return default_folder
+        try:
+            devcontainer = load_jsonc(devcontainer_path)
+        except (OSError, ValueError) as e:
+            log.warning(f"Failed to read devcontainer.json for {project_path}, using {default_folder}: {e}")
+            return default_folder
+        workspace_folder = devcontainer.get("workspaceFolder", default_folder)
+        return workspace_folder.replace("${localWorkspaceFolderBasename}", project_path.name)
+
+    @classmethod
+    def _devcontainer_launch_info(cls, desktop_info: Gio.DesktopAppInfo, project_path: Path) -> Gio.AppInfo:
+        # VSCode addresses dev containers by the hex encoded host folder path
+        folder_uri = (
+            f"vscode-remote://dev-container+{str(project_path).encode().hex()}"
+            f"{cls._devcontainer_workspace_folder(project_path)}"
+        )
+        # Keep the whole Exec line (snap/flatpak wrappers) minus its file/URI field codes
+        args = [arg for arg in shlex.split(desktop_info.get_commandline()) if not FIELD_CODE.match(arg)]
+        # create_from_commandline unquotes like an Exec key, so a literal % must be doubled
+        commandline = shlex.join(args + ["--folder-uri", folder_uri.replace("%", "%%")])
+        return Gio.AppInfo.create_from_commandline(
+            commandline, desktop_info.get_name(), Gio.AppInfoCreateFlags.NONE
+        )
+
+    def _launch_target(self, result_id: str) -> LaunchTarget:
+        """Evaluate app_rules for a project once, then serve it from the cache."""
+        if result_id in self._launch_targets:
+            return self._launch_targets[result_id]
+
+        project_path = Path(result_id)
+        for rule in self.app_rules:
+            if not self._rule_matches(rule, project_path):
+                continue
+            try:
+                desktop_info = self._first_app_info(rule.get("desktop_files", self.ide_desktop_files))
+            except FileNotFoundError as e:
+                log.debug("Skipping app rule %s for %s: %s", rule, result_id, e)
+                continue
+            log.debug("App rule %s matched %s", rule, result_id)
+            if rule.get("open_in_container"):
+                target = LaunchTarget(
+                    desktop_info, self._devcontainer_launch_info(desktop_info, project_path), []
+                )
+            else:
+                target = LaunchTarget(desktop_info, desktop_info, [project_path.as_uri()])
+            break
+        else:
+            desktop_info = self._first_app_info(self.ide_desktop_files)
+            target = LaunchTarget(desktop_info, desktop_info, [project_path.as_uri()])
+
+        self._launch_targets[result_id] = target
+        return target
+
+    def trim(self) -> None:
+        log.debug("Dropping %i cached launch targets", len(self._launch_targets))
+        self._launch_targets.clear()
+        self._desktop_infos.clear()
 
     @staticmethod
     def _filter_project(project_dir: str, terms: list[str]) -> bool:
@@ -120,7 +265,7 @@ class ProjectSearch(SearchProvider):
         return {
             "id": GLib.Variant("s", result_id),
             "name": GLib.Variant("s", search_str),
-            "gicon": GLib.Variant("s", self._app_info(result_id).get_icon().to_string()),
+            "gicon": GLib.Variant("s", self._launch_target(result_id).desktop_info.get_icon().to_string()),
             "description": GLib.Variant("s", f"Description for {result_id}"),
         }
 
@@ -133,20 +278,16 @@ class ProjectSearch(SearchProvider):
         launch_context = Gio.AppLaunchContext()
         launch_context.setenv("GIO_LAUNCH_FLAGS", "G_APP_INFO_CREATE_NEEDS_TERMINAL")
 
-        # TODO auto launch into dev container with VSCode???
-        # devcontainer_path = project_path / ".devcontainer" / "devcontainer.json"
-        # if devcontainer_path.exists():
-        #     import urllib.parse
-        #     encoded_project_path = urllib.parse.quote(str(devcontainer_path), safe='')
-        #     launch_args = ["--folder-uri", f"vscode-remote://dev-container+{encoded_project_path}"]
-        # else:
-        #     pass
-
-        launch_args = [project_path.as_uri()]
+        target = self._launch_target(result_id)
+        log.debug(f"Launching {result_id}: {target.launch_info.get_commandline()} {target.uris}")
+        target.launch_info.launch_uris_async(
+            target.uris, launch_context, None, self._on_launched, result_id
+        )
 
+    @staticmethod
+    def _on_launched(app_info: Gio.AppInfo, result: Gio.AsyncResult, result_id: str) -> None:
         try:
-            log.debug(f"Launching {result_id}: {launch_args}")
-            self._app_info(result_id).launch_uris_as_manager(launch_args, launch_context, GLib.SpawnFlags.DO_NOT_REAP_CHILD, None)
+            app_info.launch_uris_finish(result)
         except GLib.Error as e:
             log.error(f"Failed to launch {result_id}: {e.message}")
 
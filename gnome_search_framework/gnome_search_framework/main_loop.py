@@ -1,31 +1,131 @@
+import ctypes
+import ctypes.util
+import gc
 import logging
-from gi.repository import GLib
+import os
+from typing import Callable, Dict, Optional
+
+from gi.repository import Gio, GLib
 
 log = logging.getLogger(__name__)
 
+TIER_ACTIVE = "active"
+TIER_TRIMMED = "trimmed"
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes, 0 if it can't be read."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _release_free_memory() -> None:
+    """Collect garbage and hand freed heap pages back to the OS where glibc allows it."""
+    gc.collect()
+    libc_name = ctypes.util.find_library("c")
+    if libc_name is None:
+        return
+    try:
+        ctypes.CDLL(libc_name).malloc_trim(0)
+    except (OSError, AttributeError):
+        # Not glibc, nothing more we can do
+        pass
+
+
 class MainLoop():
-    """Wrapper around GLib main loop which adds an inactivity timeout."""
+    """Wrapper around GLib main loop which adds tiered inactivity timeouts.
+
+    After `trim_timeout` seconds idle the trim callback drops rebuildable caches, after `timeout` seconds idle (or on
+    memory pressure) the loop exits. `tier_rss` holds the RSS of each tier, the active figure is measured just before
+    trimming so it reflects a warm process.
+    """
     def __init__(self):
         self.loop = GLib.MainLoop()
 
         self.timeout = None
         self.timeout_id = None
 
+        self.trim_timeout = None
+        self.trim_timeout_id = None
+        self.trim_callback: Optional[Callable[[], None]] = None
+
+        self.memory_monitor = None
+        self.tier = TIER_ACTIVE
+        self.tier_rss: Dict[str, int] = {}
+
     def set_inactive_timeout(self, seconds=None):
         self.timeout = seconds
         self.reset_active_timeout()
 
+    def set_trim_callback(self, callback: Optional[Callable[[], None]] = None):
+        """Callback dropping rebuildable caches, used by both the trim timeout and memory pressure."""
+        self.trim_callback = callback
+
+    def set_trim_timeout(self, seconds=None):
+        self.trim_timeout = seconds
+        self.reset_active_timeout()
+
+    def watch_memory_pressure(self):
+        """Trim on low memory warnings and exit once the system is under real pressure (GLib >= 2.64)."""
+        if not hasattr(Gio, "MemoryMonitor"):
+            log.info("Gio.MemoryMonitor unavailable, memory pressure will be ignored")
+            return
+        self.memory_monitor = Gio.MemoryMonitor.dup_default()
+        self.memory_monitor.connect("low-memory-warning", self._low_memory_warning)
+
     def reset_active_timeout(self):
-        if self.timeout_id:
-            GLib.source_remove(self.timeout_id)
-            self.timeout_id = None
+        for source_id in (self.timeout_id, self.trim_timeout_id):
+            if source_id:
+                GLib.source_remove(source_id)
+        self.timeout_id = None
+        self.trim_timeout_id = None
+
+        if self.tier != TIER_ACTIVE:
+            # Waking up RSS is the trimmed figure, keep the active one measured just before the last trim
+            self.tier = TIER_ACTIVE
+            log.info("Entered %s tier", TIER_ACTIVE)
+
         if self.timeout:
-            GLib.timeout_add_seconds(self.timeout, lambda: self._inactive_timeout())
+            self.timeout_id = GLib.timeout_add_seconds(self.timeout, lambda: self._inactive_timeout())
+        if self.trim_timeout and self.trim_callback and (not self.timeout or self.trim_timeout < self.timeout):
+            self.trim_timeout_id = GLib.timeout_add_seconds(self.trim_timeout, lambda: self._trim_timeout())
+
+    def _enter_tier(self, tier: str):
+        self.tier = tier
+        self.tier_rss[tier] = current_rss()
+        log.info("Entered %s tier, RSS %i KiB", tier, self.tier_rss[tier] // 1024)
+
+    def _trim(self):
+        if self.tier == TIER_TRIMMED or self.trim_callback is None:
+            return
+        self.tier_rss[TIER_ACTIVE] = current_rss()
+        self.trim_callback()
+        _release_free_memory()
+        self._enter_tier(TIER_TRIMMED)
+
+    def _trim_timeout(self):
+        log.info("Trimming caches due to %i seconds inactivity timer", self.trim_timeout)
+        self.trim_timeout_id = None
+        self._trim()
+        return GLib.SOURCE_REMOVE
+
+    def _low_memory_warning(self, monitor, level):
+        if level >= Gio.MemoryMonitorWarningLevel.MEDIUM:
+            log.info("Exiting due to memory pressure (level %i)", int(level))
+            self.loop.quit()
+        else:
+            log.info("Trimming caches due to memory pressure (level %i)", int(level))
+            self._trim()
 
     def _inactive_timeout(self):
         log.info("Exiting due to %i seconds inactivity timer", self.timeout)
+        self.timeout_id = None
         self.loop.quit()
         return GLib.SOURCE_REMOVE
 
     def run(self):
+        self._enter_tier(TIER_ACTIVE)
         self.loop.run()
@@ -1,11 +1,12 @@
 import logging
 from abc import ABCMeta, abstractmethod
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
 
 import pydbus
 from gi.repository import GLib
 
 from .main_loop import MainLoop
+from .zygote_ready import notify_ready
 
 log = logging.getLogger(__name__)
 
@@ -38,26 +39,53 @@ class SearchProvider(metaclass=ABCMeta):
         </interface>
     </node>"""
 
-    def __init__(self, provider_id: str, timeout: int = 10) -> None:
+    def __init__(
+        self,
+        provider_id: str,
+        timeout: int = 300,
+        trim_timeout: Optional[int] = 10,
+        prefetch_metas: int = 5,
+    ) -> None:
         self._loop = MainLoop()
         self.provider_id = provider_id
+        # Seconds idle before exiting
         self.timeout = timeout
+        # Seconds idle before dropping rebuildable caches via trim(), None to only trim under memory pressure
+        self.trim_timeout = trim_timeout
+        # Number of top results to build metas for in the background after each result set, 0 to disable
+        self.prefetch_metas = prefetch_metas
+
+        self._meta_cache: Dict[str, dict] = {}
+        # Metas already sent in this search session, GNOME Shell doesn't ask for them again
+        self._delivered_metas: Set[str] = set()
+        self._prefetch_queue: List[str] = []
+        self._prefetch_source_id: Optional[int] = None
+        # used: served from prefetch, wasted: prefetched but never requested, missed: requested but not prefetched
+        self.prefetch_stats: Dict[str, int] = {"used": 0, "wasted": 0, "missed": 0}
 
     def start(self) -> None:
         bus = pydbus.SessionBus()
         dbus_name = f"{self.provider_id}.SearchProvider"
         log.debug("Registering D-Bus name %s", dbus_name)
         bus.publish(dbus_name, self)
+        notify_ready()
 
         log.debug("Waiting for requests on D-Bus name %s", dbus_name)
         self._loop.set_inactive_timeout(int(self.timeout))
+        self._loop.set_trim_callback(self._trim)
+        if self.trim_timeout is not None:
+            self._loop.set_trim_timeout(int(self.trim_timeout))
+        self._loop.watch_memory_pressure()
         self._loop.run()
 
     def GetInitialResultSet(self, terms):
         log.debug("Initial search for %s", str(terms))
         self._loop.reset_active_timeout()
+        self._delivered_metas.clear()
 
-        return self.search(terms)
+        results = self.search(terms)
+        self._prefetch(results)
+        return results
 
     def GetSubsearchResultSet(
         self, previous_results: List[str], terms: List[str]
@@ -66,12 +94,22 @@ class SearchProvider(metaclass=ABCMeta):
         self._loop.reset_active_timeout()
         self.terms = terms
 
-        return self.search(terms, previous_results)
+        results = self.search(terms, previous_results)
+        self._prefetch(results)
+        return results
 
     def ActivateResult(self, result: str, terms: List[str], timestamp: int):
         log.debug("Activate %s", result)
         self._loop.reset_active_timeout()
-        self.select(result)
+        # Defer to the main loop so the D-Bus reply goes out before we launch
+        GLib.idle_add(self._select_idle, result)
+
+    def _select_idle(self, result: str) -> bool:
+        try:
+            self.select(result)
+        except Exception:
+            log.exception("Failed to activate %s", result)
+        return GLib.SOURCE_REMOVE
 
     def LaunchSearch(self, terms: List[str], timestamp: int):
         log.debug("Launch search %s, %d", terms, timestamp)
@@ -83,9 +121,63 @@ class SearchProvider(metaclass=ABCMeta):
 
         metas = []
         for result_id in results:
-            metas.append(self.get_meta(result_id))
+            if result_id in self._meta_cache:
+                self.prefetch_stats["used"] += 1
+                metas.append(self._meta_cache.pop(result_id))
+            else:
+                if self.prefetch_metas > 0:
+                    self.prefetch_stats["missed"] += 1
+                if result_id in self._prefetch_queue:
+                    self._prefetch_queue.remove(result_id)
+                metas.append(self.get_meta(result_id))
+            self._delivered_metas.add(result_id)
+        log.debug("Meta prefetch stats: %s", self.prefetch_stats)
         return metas
 
+    def _prefetch(self, results: List[str]) -> None:
+        """Queue metas for the top results, GNOME Shell asks for them right after a result set."""
+        top = [r for r in results[: self.prefetch_metas] if r not in self._delivered_metas]
+        for result_id in list(self._meta_cache):
+            if result_id not in top:
+                self.prefetch_stats["wasted"] += 1
+                del self._meta_cache[result_id]
+        self._prefetch_queue = [r for r in top if r not in self._meta_cache]
+
+        if self._prefetch_queue and self._prefetch_source_id is None:
+            # Idle priority runs after the D-Bus reply is sent and yields to any incoming calls
+            self._prefetch_source_id = GLib.idle_add(self._prefetch_idle)
+
+    def _prefetch_idle(self) -> bool:
+        # One meta per iteration so the main loop can dispatch requests in between
+        if self._prefetch_queue:
+            result_id = self._prefetch_queue.pop(0)
+            try:
+                self._meta_cache[result_id] = self.get_meta(result_id)
+            except Exception:
+                log.exception("Failed to prefetch meta for %s", result_id)
+        if self._prefetch_queue:
+            return GLib.SOURCE_CONTINUE
+        self._prefetch_source_id = None
+        return GLib.SOURCE_REMOVE
+
+    def _trim(self) -> None:
+        self.prefetch_stats["wasted"] += len(self._meta_cache)
+        self._meta_cache.clear()
+        self._prefetch_queue.clear()
+        self.trim()
+
+    @property
+    def tier_rss(self) -> Dict[str, int]:
+        """Last measured RSS in bytes for each residency tier ("active", "trimmed")."""
+        return dict(self._loop.tier_rss)
+
+    def trim(self) -> None:
+        """Drop caches that can be rebuilt on demand, called when idle or under memory pressure.
+
+        Keep whatever is needed to answer the next search quickly, everything else should go.
+        """
+        pass
+
     @abstractmethod
     def search(self, terms, previous_results: Optional[list[str]] = None) -> list[str]:
         pass
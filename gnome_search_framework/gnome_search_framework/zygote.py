@@ -0,0 +1,218 @@
+"""Resident process that keeps the framework and GI imported and forks providers on D-Bus activation.
+
+Run with `python -m gnome_search_framework.zygote`. The `zygote_activate` shim is what D-Bus actually starts, it hands
+the request to this process over a unix socket and waits until the forked provider owns its bus name.
+"""
+import argparse
+import importlib.metadata
+import json
+import logging
+import os
+import runpy
+import signal
+import site
+import socket
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .zygote_ready import READY_FD_ENV
+
+log = logging.getLogger(__name__)
+
+# Distributions imported by preload(), a forked provider can't swap these for its own venv's copy
+PRELOADED_DISTS = ["gnome_search_framework", "pydbus", "PyGObject"]
+# Seconds a client gets to send its activation request before it's dropped
+REQUEST_TIMEOUT = 2
+# Fingerprints of the preloaded distributions, compared against the disk and each provider's venv
+_preloaded: Dict[str, Optional[tuple]] = {}
+
+
+def default_socket_path() -> Path:
+    # Keep in sync with zygote_activate.py, which can't import this package
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR", f"/run/user/{os.getuid()}")
+    return Path(runtime_dir) / "gnome-search-framework" / "zygote.sock"
+
+
+def _fingerprint(dist: Optional[importlib.metadata.Distribution]) -> Optional[tuple]:
+    """Version and file hashes of an installed distribution, so a rebuilt 0.1.0 still differs from the old one."""
+    if dist is None:
+        return None
+    record = dist.read_text("RECORD") or ""
+    return dist.version, frozenset(line for line in record.splitlines() if "sha256=" in line)
+
+
+def _installed_fingerprint(name: str, path: Optional[List[str]] = None) -> Optional[tuple]:
+    """Fingerprint of `name` as installed in `path` (default sys.path), None if it isn't."""
+    dist = next(iter(importlib.metadata.distributions(name=name, path=path if path is not None else sys.path)), None)
+    return _fingerprint(dist)
+
+
+def _changed_dists(path: Optional[List[str]] = None) -> List[str]:
+    """Preloaded distributions installed in `path` that differ from what the zygote imported."""
+    changed = []
+    for name, preloaded in _preloaded.items():
+        installed = _installed_fingerprint(name, path)
+        if None not in (preloaded, installed) and installed != preloaded:
+            changed.append(name)
+    return changed
+
+
+def preload() -> None:
+    """Import everything a provider would pay for at startup, before any fork."""
+    import gi
+    from gi.repository import Gio, GLib  # noqa: F401
+    import pydbus  # noqa: F401
+
+    import gnome_search_framework  # noqa: F401
+    log.debug("Preloaded GI %s", gi.__version__)
+
+    for name in PRELOADED_DISTS:
+        _preloaded[name] = _installed_fingerprint(name)
+        if _preloaded[name] is None:
+            log.warning("%s isn't installed as a package, can't check providers use the same version", name)
+
+
+def _run_provider(listener: socket.socket, conn: socket.socket, stdio: List[int], request: dict) -> int:
+    listener.close()
+    os.setsid()
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+
+    # Use the shim's stdio so provider output lands in the activated service's log, not the zygote's
+    for target_fd, fd in enumerate(stdio):
+        os.dup2(fd, target_fd)
+        os.close(fd)
+
+    # Take the environment D-Bus activated the shim with, rather than the zygote's
+    os.environ.clear()
+    os.environ.update(request.get("env", {}))
+    os.environ[READY_FD_ENV] = str(conn.detach())
+
+    project_path = Path(request["project_path"])
+    os.chdir(project_path)
+    python_version = f"python{sys.version_info.major}.{sys.version_info.minor}"
+    site_packages = project_path / ".venv" / "lib" / python_version / "site-packages"
+    if site_packages.exists():
+        changed = _changed_dists([str(site_packages)])
+        if changed:
+            # Exiting without ready makes the shim fall back to the project's run script
+            log.warning(
+                "%s in %s differ from the zygote's, falling back to a fresh interpreter. "
+                "Reinstall with --zygote to update the zygote.",
+                ", ".join(changed),
+                site_packages,
+            )
+            return 1
+        # Like the run script's venv, the project's packages win over the zygote venv and system ones
+        original_path = list(sys.path)
+        site.addsitedir(str(site_packages))
+        added = [entry for entry in sys.path if entry not in original_path]
+        sys.path[:] = added + original_path
+    sys.path.insert(0, str(project_path))
+
+    module = request["module"]
+    sys.argv = [module, *request.get("argv", [])]
+    log.info("Running %s from %s in pid %i", module, project_path, os.getpid())
+    # Let the provider configure logging as if it had started fresh
+    logging.root.handlers.clear()
+    logging.root.setLevel(logging.WARNING)
+    runpy.run_module(module, run_name="__main__", alter_sys=True)
+    return 0
+
+
+def _read_request(conn: socket.socket) -> Tuple[List[int], dict]:
+    """Receive the shim's stdio fds and request, raises ValueError if it's malformed or stalls."""
+    # A stalled client must not block activations queued behind it
+    conn.settimeout(REQUEST_TIMEOUT)
+    stdio: List[int] = []
+    try:
+        # The shim sends its stdin/stdout/stderr first, then the request as one JSON line
+        _, stdio, _, _ = socket.recv_fds(conn, 1, 3)
+        with conn.makefile("rb") as f:
+            line = f.readline()
+        if len(stdio) != 3:
+            raise ValueError(f"expected 3 stdio fds, got {len(stdio)}")
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError(f"expected a JSON object, got {line!r}")
+        missing = [key for key in ("project_path", "module") if key not in request]
+        if missing:
+            raise ValueError(f"missing {', '.join(missing)}")
+    except (OSError, ValueError) as e:
+        for fd in stdio:
+            os.close(fd)
+        raise ValueError(str(e) or type(e).__name__) from e
+    conn.settimeout(None)
+    return stdio, request
+
+
+def _spawn(listener: socket.socket, conn: socket.socket) -> None:
+    try:
+        stdio, request = _read_request(conn)
+    except ValueError as e:
+        log.error("Bad activation request: %s", e)
+        conn.close()
+        return
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid:
+        log.debug("Forked %s as pid %i", request["module"], pid)
+        for fd in stdio:
+            os.close(fd)
+        conn.close()
+        return
+
+    exit_code = 1
+    try:
+        exit_code = _run_provider(listener, conn, stdio, request)
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException:
+        log.exception("Provider %s failed", request["module"])
+    finally:
+        logging.shutdown()
+        os._exit(exit_code)
+
+
+def serve(socket_path: Path) -> None:
+    preload()
+    # Forked providers are never waited on, let the kernel reap them
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+    socket_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    socket_path.unlink(missing_ok=True)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(str(socket_path))
+    os.chmod(socket_path, 0o600)
+    listener.listen()
+    log.info("Waiting for activations on %s", socket_path)
+
+    try:
+        while True:
+            conn, _ = listener.accept()
+            changed = _changed_dists()
+            if changed:
+                # Closing without ready makes the shim fall back to run, systemd restarts us with the new code
+                log.warning("%s changed on disk since preload, exiting to be restarted", ", ".join(changed))
+                conn.close()
+                sys.exit(1)
+            _spawn(listener, conn)
+    finally:
+        listener.close()
+        socket_path.unlink(missing_ok=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Preloaded zygote for GNOME search providers")
+    parser.add_argument("--socket", type=Path, default=None, help="Unix socket to listen on")
+    parser.add_argument("--debug", action="store_true", help="Enable detailed logging to stderr")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+    serve(args.socket or default_socket_path())
+
+
+if __name__ == "__main__":
+    main()
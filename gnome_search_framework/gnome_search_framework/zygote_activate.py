@@ -0,0 +1,71 @@
+#!/usr/bin/python3 -IS
+"""D-Bus activation shim for the zygote, installed as /usr/libexec/gnome-search-framework/zygote-activate.
+
+Usage: zygote-activate PROJECT_PATH MODULE [ARGS...]
+
+Standard library only and run without site packages so it starts in a few milliseconds. Falls back to the project's
+`run` script when the zygote isn't running.
+"""
+import time
+
+START = time.monotonic()
+
+import json
+import os
+import socket
+import sys
+
+
+def socket_path() -> str:
+    # Keep in sync with zygote.default_socket_path()
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR", f"/run/user/{os.getuid()}")
+    return os.path.join(runtime_dir, "gnome-search-framework", "zygote.sock")
+
+
+def fallback(project_path: str, argv: list) -> None:
+    run = os.path.join(project_path, "run")
+    os.execv(run, [run, *argv])
+
+
+def since_exec_ms() -> float:
+    """Milliseconds since this process was exec'd, includes interpreter start (10 ms resolution)."""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        return (time.clock_gettime(time.CLOCK_BOOTTIME) - start_ticks / os.sysconf("SC_CLK_TCK")) * 1000
+    except (OSError, ValueError, IndexError):
+        return float("nan")
+
+
+def main() -> None:
+    if len(sys.argv) < 3:
+        sys.stderr.write(f"Usage: {sys.argv[0]} PROJECT_PATH MODULE [ARGS...]\n")
+        sys.exit(2)
+    project_path, module, *argv = sys.argv[1:]
+
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(socket_path())
+    except OSError:
+        fallback(project_path, argv)
+
+    request = {"project_path": project_path, "module": module, "argv": argv, "env": dict(os.environ)}
+    try:
+        # Our stdio goes to the activated service's log, the provider should write there too
+        socket.send_fds(sock, [b"F"], [0, 1, 2])
+        sock.sendall(json.dumps(request).encode() + b"\n")
+    except OSError:
+        fallback(project_path, argv)
+    # D-Bus activation fails if we exit before the provider owns its name, so wait for it
+    with sock.makefile("rb") as f:
+        reply = f.readline()
+    if reply.strip() != b"ready":
+        fallback(project_path, argv)
+    sys.stderr.write(
+        f"{module} ready via zygote in {(time.monotonic() - START) * 1000:.1f} ms "
+        f"({since_exec_ms():.0f} ms since exec)\n"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""Readiness handshake between zygote-forked providers and the activation shim.
+
+Kept separate from `zygote` so every provider can import it without paying for the zygote's imports.
+"""
+import logging
+import os
+
+log = logging.getLogger(__name__)
+
+# Set in forked providers, SearchProvider.start() reports readiness on this fd once its bus name is published
+READY_FD_ENV = "GNOME_SEARCH_ZYGOTE_READY_FD"
+
+
+def notify_ready() -> None:
+    """Tell the activation shim our bus name is published, no-op outside of the zygote."""
+    ready_fd = os.environ.pop(READY_FD_ENV, None)
+    if ready_fd is None:
+        return
+    try:
+        os.write(int(ready_fd), b"ready\n")
+    except OSError as e:
+        log.debug("Activation shim went away before ready: %s", e)
+    finally:
+        os.close(int(ready_fd))
@@ -14,6 +14,8 @@ from xdg_base_dirs import xdg_config_dirs, xdg_config_home
 
 logger = logging.getLogger(__name__)
 DIR = Path(__file__).parent
+ZYGOTE_PATH = Path('/usr') / "libexec" / "gnome-search-framework"
+ZYGOTE_SERVICE = "gnome-search-framework-zygote.service"
 
 
 def camel_to_kebab(s):
@@ -41,11 +43,13 @@ env.filters["dot_to_fw_slash"] = dot_to_fw_slash
 @click.argument("framework-path", type=click.Path(exists=True), required=True)
 @click.argument("project-path", type=click.Path(exists=True), required=True)
 @click.option("--debug", is_flag=True, help="Enable detailed logging to stderr")
+@click.option("--zygote", is_flag=True, help="Activate through the preloaded zygote service for faster cold starts")
 def main(
     action: str,
     framework_path: Path,
     project_path: Path,
     debug: bool,
+    zygote: bool,
 ):
     """
     Install or uninstall the search provider
@@ -56,6 +60,9 @@ def main(
         uninstall - Remove the search provider from the various system paths
 
     PROJECT_PATH is the path to the project directory
+
+    With --zygote the shared zygote user service is installed (or removed) too, and the provider is D-Bus activated by
+    forking from it instead of starting a fresh interpreter.
     """
     project_path = Path(project_path)
     logging.basicConfig(level=logging.DEBUG if debug else logging.INFO)
@@ -71,7 +78,10 @@ def main(
 
     # Extract the required variables from meta_data
     print(meta_data)
-    plugin_meta = {"provider": {**meta_data}}
+    plugin_meta = {"provider": {**meta_data}, "zygote": zygote, "zygote_path": ZYGOTE_PATH}
+    if zygote and "module" not in meta_data:
+        logger.error(f"meta.toml in {project_path} needs a 'module' to run with --zygote")
+        return
 
     # fmt: off
     template_output_map = {
@@ -79,6 +89,9 @@ def main(
         "search-provider.ini.jinja2": Path('/usr') / "share" / "gnome-shell"  / "search-providers" / f"{plugin_meta['provider']['id']}.search-provider.ini", # ex: org.gnome.Calendar.search-provider.ini
         "search.desktop.jinja2":      Path('/usr') / "share" / "applications" / f"{plugin_meta['provider']['id']}.SearchProvider.desktop",                   # ex: org.gnome.Calculator.desktop
     }
+    zygote_output_map = {
+        "zygote.service.jinja2":      Path('/usr') / "lib" / "systemd" / "user" / ZYGOTE_SERVICE,
+    }
     # fmt: on
 
     if action == "install":
@@ -118,11 +131,50 @@ def main(
         logger.info(f"Copying {project_path} to {output_project_path}...")
         shutil.copytree(src=project_path, dst=output_project_path, dirs_exist_ok=True)
 
+        if zygote:
+            install_zygote(framework_path, zygote_output_map, plugin_meta)
+
     elif action == "uninstall":
         for _, output_path in template_output_map.items():
             logger.info(f"Removing {output_path}...")
             output_path.unlink()
 
+        if zygote:
+            subprocess.run(["systemctl", "--global", "disable", ZYGOTE_SERVICE])
+            for _, output_path in zygote_output_map.items():
+                logger.info(f"Removing {output_path}...")
+                output_path.unlink(missing_ok=True)
+            logger.info(f"Removing {ZYGOTE_PATH}...")
+            shutil.rmtree(ZYGOTE_PATH, ignore_errors=True)
+
+
+def install_zygote(framework_path: Path, zygote_output_map: dict, plugin_meta: dict):
+    """Install the shared zygote venv, activation shim and systemd user service"""
+    import venv
+
+    ZYGOTE_PATH.mkdir(parents=True, exist_ok=True)
+    venv.create(ZYGOTE_PATH / ".venv", system_site_packages=True, with_pip=True)
+    subprocess.run([ZYGOTE_PATH / ".venv/bin/pip", "install", framework_path])
+    subprocess.run([ZYGOTE_PATH / ".venv/bin/pip", "install", "pydbus"])
+
+    activate_path = ZYGOTE_PATH / "zygote-activate"
+    logger.info(f"Writing {activate_path}...")
+    shutil.copyfile(Path(framework_path) / "gnome_search_framework" / "zygote_activate.py", activate_path)
+    activate_path.chmod(0o755)
+
+    for template_file, output_path in zygote_output_map.items():
+        logger.info(f"Writing {output_path}...")
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        template = env.get_template(template_file)
+        with open(output_path, "w") as f:
+            f.write(template.render(**plugin_meta))
+
+    subprocess.run(["systemctl", "--global", "enable", ZYGOTE_SERVICE])
+    logger.info(
+        f"Zygote enabled for new sessions, run `systemctl --user restart {ZYGOTE_SERVICE}` to (re)start it with this "
+        "framework now"
+    )
+
 
 if __name__ == "__main__":
     main()